@@ -0,0 +1,231 @@
+import os
+import csv
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+YEARS = np.arange(1995, 2016)
+MODEL = "gpt-5"
+
+PANEL_COLUMNS = [
+    'BVD_ID', 'year', 'establishment_year',
+    'company_name_orbis', 'company_name', 'company_international_name',
+    'parent_company_name_orbis',  'parent_BVD_ID', 'parent_company_ownership_years',
+    'parent_company_country', 'JV', 'GUO', 'GUO_BVD_ID', 'GUO_country', 'GUO_fav_India', 'GUO_fav_India_BVD_ID',
+    'sources']
+
+COUNTRIES = ["India", "United States", "Japan", "Germany", "United Kingdom"]
+
+def create_firms(n_firms, n_names, jv_max, owned_share, rng):
+    """
+    One row per synthetic firm with its ownership history: owned from
+    `start_year` by `n_parents` parents drawn from `n_names` parent names.
+    """
+    firms = pd.DataFrame({
+        "bvd_id": [f"SY{i:08d}" for i in range(n_firms)],
+        "name": [f"Synthetic Company {i} Ltd." for i in range(n_firms)],
+        "establishment_year": rng.integers(1950, 2010, n_firms),
+        "rename_year": rng.integers(1995, 2030, n_firms),
+        "owned": rng.random(n_firms) < owned_share,
+        "start_year": rng.integers(1980, 2016, n_firms),
+        "end_year": rng.integers(2005, 2025, n_firms),
+        "n_parents": rng.integers(1, jv_max + 1, n_firms),
+    })
+    firms["end_year"] = np.maximum(firms["end_year"], firms["start_year"])
+    firms["parents"] = [
+        rng.choice(n_names, size=min(n, n_names), replace=False).tolist()
+        for n in firms["n_parents"]
+    ]
+
+    return firms
+
+def parent_name(k):
+    return f"Parent Group {k} Ltd."
+
+def parent_bvd_id(k):
+    return f"SP{k:08d}"
+
+def create_raw_files(firms, RAW_DATA_PATH, rng):
+    n_years = len(YEARS)
+    n_firms = len(firms)
+
+    # ALL_BvDID_all_firms_update.dta: one row per firm and year
+    year = np.tile(YEARS, n_firms)
+    renamed = year >= np.repeat(firms["rename_year"].to_numpy(), n_years)
+    name = np.repeat(firms["name"].to_numpy(), n_years)
+    data_all_firms = pd.DataFrame({
+        "bvd_id_number": np.repeat(firms["bvd_id"].to_numpy(), n_years),
+        "old_bvdidnumber": "",
+        "CompanyCode": np.repeat(np.arange(n_firms), n_years).astype(str),
+        "year": year.astype("int16"),
+        "CompanyName": np.where(renamed, np.char.add(name.astype(str), " (renamed)"), name),
+        "name_internat": np.char.upper(name.astype(str)),
+        "type_of_entity": rng.choice(["Private", "Public", "Government"], n_firms * n_years),
+        "size_category": rng.choice(["Small", "Medium", "Large", "Very large"], n_firms * n_years),
+        "listed_delisted_unlisted": rng.choice(["Listed", "Unlisted", "Delisted"], n_firms * n_years),
+    })
+    data_all_firms.to_stata(os.path.join(RAW_DATA_PATH, "ALL_BvDID_all_firms_update.dta"),
+                            write_index=False, version=118)
+
+    # PANEL_controlling_firms_orbis.dta: one row per firm, owned year and parent
+    owned = firms[firms["owned"]]
+    rows = []
+    for f in owned.itertuples(index=False):
+        for y in range(max(f.start_year, 1995), min(f.end_year, 2015) + 1):
+            for k in f.parents:
+                rows.append((f.bvd_id, parent_bvd_id(k), y, parent_name(k), parent_name(k).upper(),
+                             f.start_year, f.end_year))
+    data_orbis = pd.DataFrame(rows, columns=[
+        "bvd_id_number", "controlling_bvd_id", "year_of_control", "Orbis_controlling_name",
+        "controlling_firm_name", "start_year", "end_year"])
+    data_orbis = data_orbis.astype({"year_of_control": "int16", "start_year": "int16", "end_year": "int16"})
+    data_orbis.to_stata(os.path.join(RAW_DATA_PATH, "PANEL_controlling_firms_orbis.dta"),
+                        write_index=False, version=118)
+
+    # Ownership_data_for_ChatGPT.dta: firm and parent names to BVD IDs
+    ownership = (
+        data_all_firms[["bvd_id_number", "CompanyName"]]
+        .drop_duplicates()
+        .merge(data_orbis[["bvd_id_number", "controlling_bvd_id", "Orbis_controlling_name"]].drop_duplicates(),
+               how="left", on="bvd_id_number")
+        .fillna("")
+    )
+    ownership.to_stata(os.path.join(RAW_DATA_PATH, "Ownership_data_for_ChatGPT.dta"),
+                       write_index=False, version=118)
+
+def firm_spans(f):
+    # Same shape as the code_interpreter answers, see compact_payload.py
+    parents = [parent_name(k) for k in f.parents]
+    countries = [COUNTRIES[k % len(COUNTRIES)] for k in f.parents]
+    ownership = {
+        "parent_company_name_orbis": parents,
+        "parent_company_country": countries,
+        "JV": int(len(parents) > 1),
+        "GUO": parents[0],
+        "GUO_country": countries[0],
+        "parent_company_ownership_years": [f"{f.start_year}-{f.end_year}"] * len(parents),
+    }
+
+    cuts = sorted({1995, 2016, int(np.clip(f.rename_year, 1995, 2016))}
+                  | ({int(np.clip(f.start_year, 1995, 2016)), int(np.clip(f.end_year + 1, 1995, 2016))}
+                     if f.owned else set()))
+    spans = []
+    for first, last in zip(cuts[:-1], cuts[1:]):
+        if first == last:
+            continue
+        span = {"years": first if first == last - 1 else f"{first}-{last - 1}", "JV": 0}
+        if first >= f.rename_year:
+            span["company_name"] = f"{f.name} (renamed)"
+        if f.owned and f.start_year <= first <= f.end_year:
+            span.update(ownership)
+        spans.append(span)
+
+    return spans
+
+def create_responses(firms, LLM_RESPONSES_DATA_PATH):
+    for f in firms.itertuples(index=False):
+        payload = {
+            "columns": ["company_name", "company_international_name", "establishment_year",
+                        "parent_company_name_orbis", "parent_company_country", "JV", "GUO",
+                        "GUO_country", "parent_company_ownership_years", "sources"],
+            "constant": {
+                "company_name": f.name,
+                "company_international_name": f.name.upper(),
+                "establishment_year": int(f.establishment_year),
+                "sources": f"https://example.com/{f.bvd_id}",
+            },
+            "spans": firm_spans(f),
+        }
+        response = {
+            "timestamp": "2025-01-01T00:00:30",
+            "response": {
+                "created_at": 1735689600.0,
+                "output": [
+                    {"type": "code_interpreter_call"},
+                    {"type": "message", "content": [{"type": "output_text",
+                        "text": json.dumps(payload, ensure_ascii=False, separators=(",", ":"))}]},
+                ],
+                "usage": {"input_tokens": 9000, "output_tokens": 2500},
+            },
+        }
+        file_name = f"{LLM_RESPONSES_DATA_PATH}/{f.bvd_id}_{MODEL}_json.json"
+        with open(file_name, "w", encoding="utf-8") as fp:
+            json.dump(response, fp, ensure_ascii=False)
+
+def create_company_files(firms, COMPANY_FOLDER_PATH):
+    # Formatted panels as written by post_llm_format.py, one row per parent
+    for f in firms.itertuples(index=False):
+        file_name = f"{COMPANY_FOLDER_PATH}/{f.bvd_id}_{MODEL}_panel.csv"
+        with open(file_name, "w", encoding="utf-8", newline="") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(PANEL_COLUMNS)
+            for y in YEARS:
+                name = f"{f.name} (renamed)" if y >= f.rename_year else f.name
+                owned = f.owned and f.start_year <= y <= f.end_year
+                for k in (f.parents if owned else [None]):
+                    parent = parent_name(k) if k is not None else ""
+                    parent_id = parent_bvd_id(k) if k is not None else ""
+                    country = COUNTRIES[k % len(COUNTRIES)] if k is not None else ""
+                    guo = parent_name(f.parents[0]) if owned else ""
+                    guo_id = parent_bvd_id(f.parents[0]) if owned else ""
+                    writer.writerow([
+                        f.bvd_id, y, f.establishment_year, f.name, name, f.name.upper(),
+                        parent, parent_id, f"{f.start_year}-{f.end_year}" if owned else "",
+                        country, int(owned and len(f.parents) > 1), guo, guo_id,
+                        COUNTRIES[f.parents[0] % len(COUNTRIES)] if owned else "", guo, guo_id,
+                        f"https://example.com/{f.bvd_id}"])
+
+def create_synthetic_data(OUTPUT_PATH, n_firms, n_names=500, jv_max=3, owned_share=0.6, seed=0):
+    """
+    Synthetic Orbis-scale inputs in the parent directory structure of the
+    README: raw `.dta` files, `_json.json` responses and company panels.
+
+    Args:
+        n_firms (int): Number of firms.
+        n_names (int): Number of distinct parent company names.
+        jv_max (int): Maximum number of parents per firm (JV list length).
+        owned_share (float): Share of firms with a parent company.
+
+    Returns:
+        dict: The paths, with the names of the .env variables.
+    """
+    paths = {
+        "RAW_DATA_PATH": os.path.join(OUTPUT_PATH, "raw_data"),
+        "PROCESSED_DATA_PATH": os.path.join(OUTPUT_PATH, "processed_data"),
+        "COMPANY_FOLDER_PATH": os.path.join(OUTPUT_PATH, "processed_data", "company_files"),
+        "LLM_RESPONSES_DATA_PATH": os.path.join(OUTPUT_PATH, "processed_data", "responses"),
+    }
+    paths["MASTER_DATA_PATH"] = os.path.join(paths["PROCESSED_DATA_PATH"], "raw_master_data.csv")
+    paths["RAW_OWNERSHIP_DATA_PATH"] = os.path.join(paths["RAW_DATA_PATH"], "Ownership_data_for_ChatGPT.dta")
+    for key in ["RAW_DATA_PATH", "COMPANY_FOLDER_PATH", "LLM_RESPONSES_DATA_PATH"]:
+        os.makedirs(paths[key], exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    firms = create_firms(n_firms, n_names, jv_max, owned_share, rng)
+
+    create_raw_files(firms, paths["RAW_DATA_PATH"], rng)
+    create_responses(firms, paths["LLM_RESPONSES_DATA_PATH"])
+    create_company_files(firms, paths["COMPANY_FOLDER_PATH"])
+
+    return paths
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Generate synthetic Orbis inputs and LLM responses.")
+    parser.add_argument("--output", type=str, required=True, help="Folder for the synthetic parent directory structure.")
+    parser.add_argument("--firms", type=int, default=1000, help="Number of firms (default: 1000)")
+    parser.add_argument("--names", type=int, default=500, help="Number of distinct parent company names (default: 500)")
+    parser.add_argument("--jv_max", type=int, default=3, help="Maximum number of parents per firm (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    paths = create_synthetic_data(
+        OUTPUT_PATH=args.output,
+        n_firms=args.firms,
+        n_names=args.names,
+        jv_max=args.jv_max,
+        seed=args.seed)
+
+    for key, path in paths.items():
+        print(f"{key}={path}")
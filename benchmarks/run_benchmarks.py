@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from generate_synthetic_data import create_synthetic_data
+from merge_raw_data import create_raw_master_file
+from llm_web_search_call import filter_company
+from post_llm_format import (
+    load_llm_json_response_text, create_bvd_id_map_dicts, expand_columns, map_ids,
+    create_guo_india_columns, order_columns, clean_nans, clean_formats)
+from merge_processed_data import create_master_file
+
+MODEL = "gpt-5"
+
+def measure(func, *args, memory=True, **kwargs):
+    """
+    Wall time of a call, and its peak Python memory in a second run under
+    tracemalloc (so the time is not slowed down by the tracing).
+    """
+    start_time = time.perf_counter()
+    func(*args, **kwargs)
+    seconds = time.perf_counter() - start_time
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        func(*args, **kwargs)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+
+    return seconds, peak_mb
+
+def post_llm_format_chain(paths, bvd_ids, company_id_map):
+    # Same pipe as post_llm_format.py, without saving the panels
+    for bvd_id in bvd_ids:
+        (
+            load_llm_json_response_text(paths["LLM_RESPONSES_DATA_PATH"], bvd_id, MODEL)
+            .pipe(expand_columns)
+            .pipe(map_ids,
+                company_id_map=company_id_map,
+                BVD_ID=bvd_id,
+                COMPANY_ORBIS_NAME=bvd_id)
+            .pipe(create_guo_india_columns, company_id_map=company_id_map)
+            .pipe(order_columns)
+            .pipe(clean_nans)
+            .pipe(clean_formats)
+        )
+
+def filter_companies(paths, bvd_ids):
+    for bvd_id in bvd_ids:
+        filter_company(RAW_DATA_PATH=paths["MASTER_DATA_PATH"], BVD_ID=bvd_id)
+
+def run_benchmarks(paths, n_firms, sample=100, memory=True):
+    """
+    Time and peak memory per local (non-LLM) stage. Per-company stages run on
+    `sample` companies and are extrapolated to all of them.
+    """
+    results = []
+
+    def add(stage, calls, seconds, peak_mb, per_company=False):
+        results.append({
+            "firms": n_firms,
+            "stage": stage,
+            "calls": calls,
+            "seconds": seconds,
+            "seconds_all_firms": seconds * n_firms / calls if per_company else seconds,
+            "peak_mb": peak_mb,
+        })
+
+    seconds, peak_mb = measure(
+        create_raw_master_file,
+        RAW_DATA_PATH=paths["RAW_DATA_PATH"],
+        FIRMS_STATA_FILENAME="ALL_BvDID_all_firms_update.dta",
+        ORBIS_STATA_FILENAME="PANEL_controlling_firms_orbis.dta",
+        MASTER_DATA_PATH=paths["MASTER_DATA_PATH"],
+        memory=memory)
+    add("create_raw_master_file", 1, seconds, peak_mb)
+
+    bvd_ids = pd.read_csv(paths["MASTER_DATA_PATH"], usecols=["BVD_ID"]).BVD_ID.unique()[:sample]
+
+    seconds, peak_mb = measure(filter_companies, paths, bvd_ids, memory=memory)
+    add("filter_company", len(bvd_ids), seconds, peak_mb, per_company=True)
+
+    seconds, peak_mb = measure(create_bvd_id_map_dicts, paths["RAW_OWNERSHIP_DATA_PATH"], memory=memory)
+    add("create_bvd_id_map_dicts", 1, seconds, peak_mb)
+
+    company_id_map = create_bvd_id_map_dicts(paths["RAW_OWNERSHIP_DATA_PATH"])
+    seconds, peak_mb = measure(post_llm_format_chain, paths, bvd_ids, company_id_map, memory=memory)
+    add("post_llm_format", len(bvd_ids), seconds, peak_mb, per_company=True)
+
+    seconds, peak_mb = measure(
+        create_master_file,
+        COMPANY_FOLDER_PATH=paths["COMPANY_FOLDER_PATH"],
+        PROCESSED_DATA_PATH=paths["PROCESSED_DATA_PATH"],
+        output_name="processed_master_file",
+        memory=memory)
+    add("create_master_file", 1, seconds, peak_mb)
+
+    return pd.DataFrame(results)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the local pandas stages on synthetic data.")
+    parser.add_argument("--firms", type=int, nargs="+", default=[1000, 10000, 100000], help="Numbers of firms (default: 1000 10000 100000)")
+    parser.add_argument("--names", type=int, default=500, help="Number of distinct parent company names (default: 500)")
+    parser.add_argument("--jv_max", type=int, default=3, help="Maximum number of parents per firm (default: 3)")
+    parser.add_argument("--sample", type=int, default=100, help="Companies timed in the per-company stages (default: 100)")
+    parser.add_argument("--no_memory", action="store_true", help="Skip the peak memory runs.")
+    parser.add_argument("--output", type=str, default=None, help="Optional .csv file for the results.")
+    args = parser.parse_args()
+
+    all_results = []
+    for n_firms in args.firms:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(f"Generating synthetic data for {n_firms} firms...")
+            paths = create_synthetic_data(tmp, n_firms=n_firms, n_names=args.names, jv_max=args.jv_max)
+            print(f"Benchmarking {n_firms} firms...")
+            results = run_benchmarks(paths, n_firms, sample=args.sample, memory=not args.no_memory)
+        print(results.to_string(index=False, float_format="{:.2f}".format))
+        all_results.append(results)
+
+    results = pd.concat(all_results, ignore_index=True)
+    if args.output is not None:
+        results.to_csv(args.output, index=False)
+        print(f"Done! Saved as {args.output}")
@@ -0,0 +1,125 @@
+import json
+import numpy as np
+import pandas as pd
+
+# Format of the compact payload, also given to the LLM to answer in the same shape
+PAYLOAD_FORMAT = """{"columns": [all column names except 'year'],
+           "constant": {column: value, for the columns with the same value in every year},
+           "spans": [{"years": "1995-2003", column: value, ...}, {"years": 2004, ...}]}
+        'spans' groups consecutive years where all the other columns have identical values. 'years' is "first-last" or a single year. Empty (null) values are left out.
+        A column with several values in a year (e.g. several parent companies) is a list. The values at the same position of the lists of a year belong together."""
+
+def normalize_value(x):
+    # JSON friendly scalars, NaNs as None, whole floats as ints
+    if isinstance(x, (list, tuple, np.ndarray)):
+        return [normalize_value(v) for v in x]
+    if isinstance(x, np.generic):
+        x = x.item()
+    if x is None or (not isinstance(x, str) and pd.isna(x)):
+        return None
+    if isinstance(x, float) and x.is_integer():
+        return int(x)
+    return x
+
+def value_key(x):
+    return json.dumps(x, ensure_ascii=False, sort_keys=True)
+
+def collapse_years(data, index="year"):
+    """
+    One record per year. Columns with the same value in all the distinct
+    rows of a year are kept as a value, the others as a list with one value
+    per row, so the values at the same position stay together.
+    """
+    columns = [c for c in data.columns if c != index]
+    records = {}
+    for year, group in data.groupby(index, sort=True):
+        rows = {}
+        for values in group[columns].itertuples(index=False, name=None):
+            row = {col: normalize_value(v) for col, v in zip(columns, values)}
+            rows.setdefault(value_key(row), row)
+        rows = list(rows.values())
+
+        records[int(year)] = {
+            col: rows[0][col] if len({value_key(r[col]) for r in rows}) == 1 else [r[col] for r in rows]
+            for col in columns
+        }
+
+    return columns, records
+
+def encode_payload(data, index="year"):
+    """
+    Compact JSON payload of a company panel: constant columns go to a header
+    and consecutive years with identical values are run-length encoded.
+    Decode with `decode_payload`.
+    """
+    columns, records = collapse_years(data, index=index)
+    years = list(records)
+
+    constant = {}
+    for col in columns:
+        values = [records[y][col] for y in years]
+        if years and len({value_key(v) for v in values}) == 1 and values[0] is not None:
+            constant[col] = values[0]
+
+    spans = []
+    start = prev = prev_key = None
+    for year in years:
+        record = {c: v for c, v in records[year].items() if c not in constant and v is not None}
+        key = value_key(record)
+        if prev is not None and year == prev + 1 and key == prev_key:
+            prev = year
+            continue
+        if prev is not None:
+            spans.append(make_span(start, prev, span_record))
+        start = prev = year
+        prev_key = key
+        span_record = record
+    if prev is not None:
+        spans.append(make_span(start, prev, span_record))
+
+    return {"columns": columns, "constant": constant, "spans": spans}
+
+def make_span(start, end, record):
+    return {"years": start if start == end else f"{start}-{end}", **record}
+
+def parse_years(years):
+    if isinstance(years, str) and "-" in years.strip()[1:]:
+        first, last = years.strip().split("-", 1)
+        return list(range(int(first), int(last) + 1))
+    return [int(years)]
+
+def decode_payload(payload, index="year"):
+    """
+    DataFrame with one row per year out of an `encode_payload` payload.
+    """
+    columns = list(payload.get("columns", []))
+    constant = payload.get("constant", {})
+    for col in list(constant) + [c for s in payload.get("spans", []) for c in s if c != "years"]:
+        if col not in columns:
+            columns.append(col)
+
+    rows = []
+    for span in payload.get("spans", []):
+        values = {c: v for c, v in span.items() if c != "years"}
+        for year in parse_years(span["years"]):
+            rows.append({index: year, **{c: None for c in columns}, **constant, **values})
+
+    return (
+        pd.DataFrame(rows, columns=[index] + columns)
+        .sort_values(index, kind="stable")
+        .reset_index(drop=True)
+    )
+
+def is_compact_payload(parsed):
+    return isinstance(parsed, dict) and "spans" in parsed
+
+def encode_payload_text(data, index="year"):
+    return json.dumps(encode_payload(data, index=index), ensure_ascii=False, separators=(",", ":"))
+
+def decode_payload_text(text, index="year"):
+    # LLM answer in the compact format, raises ValueError otherwise
+    parsed = json.loads(text)
+    if not is_compact_payload(parsed):
+        raise ValueError("LLM answer is not in the compact JSON format")
+
+    return decode_payload(parsed, index=index)
@@ -0,0 +1,338 @@
+import os
+import json
+import dotenv
+import sqlite3
+import argparse
+import threading
+import pandas as pd
+from openai import OpenAI
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm_streaming import partial_file_name
+from llm_web_search_call import format_company, create_websearch_llm_response
+from llm_code_interpreter_call import load_llm_web_response_text, create_json_llm_response
+from validate_llm_json import (
+    validate_json_response, has_gaps, print_gaps, create_repair_llm_response,
+    apply_repair, is_repaired, save_repaired_json_response)
+from post_llm_format import (
+    load_llm_json_response_text, create_bvd_id_map_dicts, expand_columns, map_ids,
+    create_guo_india_columns, order_columns, clean_nans, clean_formats)
+
+def load_dotenv():
+    # Ref: https://stackoverflow.com/a/78972639/
+    dotenv.load_dotenv()
+    dotenv.load_dotenv(dotenv.find_dotenv(usecwd=True))
+
+class JobQueue:
+    """
+    Persistent job queue (sqlite), one job per BVD_ID and model. Jobs
+    interrupted by a restart are queued again.
+    """
+
+    def __init__(self, DB_PATH):
+        self.lock = threading.Lock()
+        self.new_job = threading.Condition(self.lock)
+        self.db = sqlite3.connect(DB_PATH, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock:
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    bvd_id TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL)""")
+            self.db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            self.db.commit()
+
+    def submit(self, bvd_id, model, panel_exists):
+        # Same BVD_ID already queued, running or done: return that job
+        with self.lock:
+            job = self.db.execute("""
+                SELECT * FROM jobs WHERE bvd_id = ? AND model = ? AND status IN ('queued', 'running', 'done')
+                ORDER BY id DESC LIMIT 1""", (bvd_id, model)).fetchone()
+            if job is not None and (job["status"] != "done" or panel_exists):
+                return dict(job)
+
+            now = datetime.now().isoformat()
+            cursor = self.db.execute(
+                "INSERT INTO jobs (bvd_id, model, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+                (bvd_id, model, now, now))
+            self.db.commit()
+            self.new_job.notify()
+            return dict(self.db.execute("SELECT * FROM jobs WHERE id = ?", (cursor.lastrowid,)).fetchone())
+
+    def claim(self, timeout=5):
+        # Oldest queued job, marked as running
+        with self.lock:
+            job = self.db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if job is None:
+                self.new_job.wait(timeout)
+                return None
+            self.db.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                            (datetime.now().isoformat(), job["id"]))
+            self.db.commit()
+            return dict(job)
+
+    def finish(self, job_id, error=None):
+        with self.lock:
+            self.db.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                            ("failed" if error else "done", error, datetime.now().isoformat(), job_id))
+            self.db.commit()
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(job) if job is not None else None
+
+    def list(self, status=None):
+        with self.lock:
+            if status is None:
+                jobs = self.db.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+            else:
+                jobs = self.db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,)).fetchall()
+        return [dict(job) for job in jobs]
+
+class CompanyService:
+    """
+    Runs the pipeline stages of a company in-process, keeping the master
+    data, the ownership map and the OpenAI client loaded between jobs.
+    """
+
+    def __init__(self, paths, MODEL, CHATGPT_KEY, idle_timeout=120):
+        self.paths = paths
+        self.MODEL = MODEL
+        self.CHATGPT_KEY = CHATGPT_KEY
+        self.idle_timeout = idle_timeout
+        self.client = OpenAI(api_key=CHATGPT_KEY)
+        self.master_lock = threading.Lock()
+        self.master_mtime = None
+        self.queue = JobQueue(os.path.join(paths["PROCESSED_DATA_PATH"], f"{MODEL}_jobs.sqlite"))
+        self.load_master_data()
+
+    def load_master_data(self):
+        # Reloaded only when merge_raw_data.py rewrites the master file
+        with self.master_lock:
+            mtime = os.path.getmtime(self.paths["MASTER_DATA_PATH"])
+            if mtime != self.master_mtime:
+                print("Loading master data and ownership map...")
+                self.master = pd.read_csv(self.paths["MASTER_DATA_PATH"])
+                self.bvd_ids = set(self.master["BVD_ID"].dropna().astype(str))
+                self.company_id_map = create_bvd_id_map_dicts(self.paths["RAW_OWNERSHIP_DATA_PATH"])
+                self.master_mtime = mtime
+            return self.master, self.company_id_map
+
+    def file_name(self, bvd_id, stage):
+        if stage == "panel":
+            return f"{self.paths['COMPANY_FOLDER_PATH']}/{bvd_id}_{self.MODEL}_panel.csv"
+        return f"{self.paths['LLM_RESPONSES_DATA_PATH']}/{bvd_id}_{self.MODEL}_{stage}.json"
+
+    def has_company(self, bvd_id):
+        self.load_master_data()
+        return bvd_id in self.bvd_ids
+
+    def submit(self, bvd_id):
+        return self.queue.submit(bvd_id, self.MODEL, os.path.exists(self.file_name(bvd_id, "panel")))
+
+    def save_response(self, file_name, response):
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(),
+                "response": response.model_dump()
+            }, f, ensure_ascii=False, indent=2)
+        if os.path.exists(partial_file_name(file_name)):
+            os.remove(partial_file_name(file_name))
+
+    def process_company(self, bvd_id):
+        # Same stages as loop_all_companies.py, skipping the existing files
+        master, company_id_map = self.load_master_data()
+        rows = master[master["BVD_ID"] == bvd_id]
+        if rows.empty:
+            raise ValueError(f"BVD_ID '{bvd_id}' not found in the raw master data")
+        data = format_company(rows)
+        paths, MODEL = self.paths, self.MODEL
+
+        file_name = self.file_name(bvd_id, "websearch")
+        if not os.path.exists(file_name):
+            response_web = create_websearch_llm_response(
+                data=data,
+                CHATGPT_KEY=self.CHATGPT_KEY,
+                MODEL=MODEL,
+                print_cost=True,
+                PARTIAL_FILE_PATH=partial_file_name(file_name),
+                idle_timeout=self.idle_timeout,
+                client=self.client)
+            self.save_response(file_name, response_web)
+
+        llm_text = load_llm_web_response_text(paths["LLM_RESPONSES_DATA_PATH"], bvd_id, MODEL)
+
+        file_name = self.file_name(bvd_id, "json")
+        if not os.path.exists(file_name):
+            response_json = create_json_llm_response(
+                llm_text=llm_text,
+                data=data,
+                CHATGPT_KEY=self.CHATGPT_KEY,
+                MODEL=MODEL,
+                print_cost=True,
+                PARTIAL_FILE_PATH=partial_file_name(file_name),
+                idle_timeout=self.idle_timeout,
+                client=self.client)
+            self.save_response(file_name, response_json)
+
+        df = load_llm_json_response_text(paths["LLM_RESPONSES_DATA_PATH"], bvd_id, MODEL)
+        gaps = validate_json_response(df)
+        if has_gaps(gaps) and not is_repaired(paths["LLM_RESPONSES_DATA_PATH"], bvd_id, MODEL):
+            print(f"✗ JSON LLM response of {bvd_id} has gaps:")
+            print_gaps(gaps)
+            # The panel is still written from the unrepaired response
+            try:
+                response_repair = create_repair_llm_response(
+                    llm_text=llm_text,
+                    data=df,
+                    gaps=gaps,
+                    CHATGPT_KEY=self.CHATGPT_KEY,
+                    MODEL=MODEL,
+                    print_cost=True,
+                    client=self.client)
+                repaired = apply_repair(df, response_repair)
+                save_repaired_json_response(paths["LLM_RESPONSES_DATA_PATH"], bvd_id, MODEL, repaired, response_repair)
+                df = repaired
+            except Exception as e:
+                print(f"✗ Error repairing {bvd_id}, keeping the unrepaired response: {e}")
+
+        df = (
+            df
+            .pipe(expand_columns)
+            .pipe(map_ids,
+                company_id_map=company_id_map,
+                BVD_ID=bvd_id,
+                COMPANY_ORBIS_NAME=rows.company_name.unique()[0])
+            .pipe(create_guo_india_columns, company_id_map=company_id_map)
+            .pipe(order_columns)
+            .pipe(clean_nans)
+            .pipe(clean_formats)
+        )
+        df.to_csv(self.file_name(bvd_id, "panel"), index=False)
+        print(f"Done! Saved as {self.file_name(bvd_id, 'panel')}")
+
+    def worker(self, stop):
+        while not stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                continue
+            print(f"Processing BVD_ID: {job['bvd_id']} (job {job['id']})")
+            try:
+                self.process_company(job["bvd_id"])
+                self.queue.finish(job["id"])
+            except Exception as e:
+                print(f"✗ Error processing {job['bvd_id']}: {e}")
+                self.queue.finish(job["id"], error=str(e))
+
+    def panel_rows(self, job):
+        # None when the panel was deleted after the job, e.g. by loop_all_companies.py invalidation
+        file_name = self.file_name(job["bvd_id"], "panel")
+        if not os.path.exists(file_name):
+            return None
+        return json.loads(pd.read_csv(file_name).to_json(orient="records", force_ascii=False))
+
+def create_handler(service):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def send_json(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            # POST /jobs {"bvd_ids": ["IN31739FI", ...]}
+            if urlparse(self.path).path.rstrip("/") != "/jobs":
+                return self.send_json(404, {"error": "Not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                bvd_ids = body.get("bvd_ids") or [body["bvd_id"]]
+            except (ValueError, KeyError, TypeError, AttributeError):
+                bvd_ids = None
+            if not isinstance(bvd_ids, list) or not all(isinstance(b, str) and b for b in bvd_ids):
+                return self.send_json(400, {"error": "Expected a JSON object with 'bvd_ids' (list of strings) or 'bvd_id' (string)"})
+
+            unknown = [bvd_id for bvd_id in bvd_ids if not service.has_company(bvd_id)]
+            if unknown:
+                return self.send_json(404, {"error": "BVD_IDs not found in the master data", "bvd_ids": unknown})
+
+            jobs = [service.submit(bvd_id) for bvd_id in dict.fromkeys(bvd_ids)]
+            self.send_json(202, {"jobs": jobs})
+
+        def do_GET(self):
+            # GET /jobs, /jobs/<id>, /jobs/<id>/panel
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+
+            if parts == ["jobs"]:
+                status = parse_qs(url.query).get("status", [None])[0]
+                return self.send_json(200, {"jobs": service.queue.list(status)})
+
+            if len(parts) in (2, 3) and parts[0] == "jobs" and parts[1].isdigit():
+                job = service.queue.get(int(parts[1]))
+                if job is None:
+                    return self.send_json(404, {"error": f"Job {parts[1]} not found"})
+                if len(parts) == 2:
+                    return self.send_json(200, job)
+                if parts[2] == "panel":
+                    if job["status"] != "done":
+                        return self.send_json(409, {"error": f"Job is {job['status']}", "job": job})
+                    rows = service.panel_rows(job)
+                    if rows is None:
+                        # Queued again, the new job builds the panel
+                        return self.send_json(404, {"error": "Panel not found, company queued again", "job": service.submit(job["bvd_id"])})
+                    return self.send_json(200, {"job": job, "rows": rows})
+
+            self.send_json(404, {"error": "Not found"})
+
+    return Handler
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Local service for on-demand company lookups.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--model", type=str, default="gpt-5", help="LLM model to use (default: gpt-5)")
+    parser.add_argument("--workers", type=int, default=2, help="Companies processed at the same time (default: 2)")
+    parser.add_argument("--idle_timeout", type=int, default=120, help="Seconds without streamed events before retrying a call (default: 120)")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    paths = {
+        key: os.getenv(key) for key in [
+            "RAW_OWNERSHIP_DATA_PATH", "MASTER_DATA_PATH", "PROCESSED_DATA_PATH",
+            "LLM_RESPONSES_DATA_PATH", "COMPANY_FOLDER_PATH"]
+    }
+
+    service = CompanyService(
+        paths=paths,
+        MODEL=args.model,
+        CHATGPT_KEY=os.getenv("CHATGPT_KEY"),
+        idle_timeout=args.idle_timeout)
+
+    stop = threading.Event()
+    workers = [threading.Thread(target=service.worker, args=(stop,), daemon=True) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), create_handler(service))
+    print(f"Listening on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
@@ -0,0 +1,242 @@
+import os
+import json
+import dotenv
+import argparse
+import pandas as pd
+from datetime import datetime
+from llm_web_search_call import format_company, create_websearch_prompt
+from llm_code_interpreter_call import create_json_prompt, load_llm_web_response_text
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Pricing per 1M tokens
+PRICING = {
+    "gpt-5": {"input": 1.250, "cached": 0.125, "output": 10.000},
+    "gpt-5-mini": {"input": 0.250, "cached": 0.025, "output": 2.000},
+    "gpt-5-nano": {"input": 0.050, "cached": 0.005, "output": 0.400},
+}
+
+# Used when there are no stored responses for a stage yet. Billed input and
+# output tokens per local prompt token, rough values from the README runs.
+DEFAULT_RATIOS = {
+    "websearch": {"input": 80.0, "output": 28.0, "seconds_per_output_token": 0.020},
+    "json": {"input": 1.2, "output": 0.65, "seconds_per_output_token": 0.025},
+}
+
+def load_dotenv():
+    # Ref: https://stackoverflow.com/a/78972639/
+    dotenv.load_dotenv()
+    dotenv.load_dotenv(dotenv.find_dotenv(usecwd=True))
+
+def get_encoding():
+    # tiktoken downloads the encoding once, then reads it from its cache
+    global tiktoken
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        tiktoken = None
+        return None
+
+def count_tokens(text):
+    # Offline tokenizer, ~4 characters per token if tiktoken is not available
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text))
+
+def load_companies(MASTER_DATA_PATH):
+    # Same rows as filter_company, reading the master file only once
+    df = pd.read_csv(MASTER_DATA_PATH)
+
+    return {
+        bvd_id: format_company(group)
+        for bvd_id, group in df.dropna(subset="BVD_ID").groupby("BVD_ID", sort=False)
+    }
+
+def read_response_usage(file_name):
+    with open(file_name, "r", encoding="utf-8") as f:
+        json_parsed = json.load(f)
+
+    response = json_parsed["response"]
+    # Responses saved without trailing metadata have no usage
+    usage = response.get("usage") or {}
+    seconds = float("nan")
+    if response.get("created_at") is not None:
+        seconds = datetime.fromisoformat(json_parsed["timestamp"]).timestamp() - response["created_at"]
+
+    return {
+        "input_tokens": usage.get("input_tokens", float("nan")),
+        "output_tokens": usage.get("output_tokens", float("nan")),
+        "seconds": seconds,
+    }
+
+def load_history(companies, LLM_RESPONSES_DATA_PATH, MODEL):
+    """
+    Billed tokens and duration of the stored responses, next to the size of
+    the prompt that produced them.
+    """
+    rows = []
+    for bvd_id, data in companies.items():
+        web_file = f"{LLM_RESPONSES_DATA_PATH}/{bvd_id}_{MODEL}_websearch.json"
+        json_file = f"{LLM_RESPONSES_DATA_PATH}/{bvd_id}_{MODEL}_json.json"
+
+        if not os.path.exists(web_file):
+            continue
+        rows.append({
+            "stage": "websearch",
+            "prompt_tokens": count_tokens(create_websearch_prompt(data)),
+            **read_response_usage(web_file),
+        })
+
+        if not os.path.exists(json_file):
+            continue
+        llm_text = load_llm_web_response_text(LLM_RESPONSES_DATA_PATH, bvd_id, MODEL)
+        rows.append({
+            "stage": "json",
+            "prompt_tokens": count_tokens(create_json_prompt(llm_text, data)),
+            **read_response_usage(json_file),
+        })
+
+    return pd.DataFrame(rows, columns=["stage", "prompt_tokens", "input_tokens", "output_tokens", "seconds"])
+
+def compute_ratios(history):
+    ratios = {}
+    for stage, default in DEFAULT_RATIOS.items():
+        # Responses without usage or duration are left out of their ratios
+        df = history[(history["stage"] == stage) & history["output_tokens"].notna()]
+        timed = df[df["seconds"].notna()]
+
+        ratios[stage] = dict(default)
+        if df["prompt_tokens"].sum() > 0 and df["output_tokens"].sum() > 0:
+            ratios[stage]["input"] = df["input_tokens"].sum() / df["prompt_tokens"].sum()
+            ratios[stage]["output"] = df["output_tokens"].sum() / df["prompt_tokens"].sum()
+        if timed["output_tokens"].sum() > 0:
+            ratios[stage]["seconds_per_output_token"] = timed["seconds"].sum() / timed["output_tokens"].sum()
+
+    return ratios
+
+def estimate_companies(companies, ratios, LLM_RESPONSES_DATA_PATH, MODEL):
+    """
+    Projected tokens, cost and time of the stages still missing per company.
+    """
+    if MODEL not in PRICING:
+        raise ValueError(f"Unknown model '{MODEL}'. Choose from: {list(PRICING.keys())}")
+
+    rows = []
+    for bvd_id, data in companies.items():
+        web_file = f"{LLM_RESPONSES_DATA_PATH}/{bvd_id}_{MODEL}_websearch.json"
+        json_file = f"{LLM_RESPONSES_DATA_PATH}/{bvd_id}_{MODEL}_json.json"
+
+        prompt_tokens = {}
+        if os.path.exists(web_file):
+            llm_text = load_llm_web_response_text(LLM_RESPONSES_DATA_PATH, bvd_id, MODEL)
+            json_prompt = count_tokens(create_json_prompt(llm_text, data))
+        else:
+            prompt_tokens["websearch"] = count_tokens(create_websearch_prompt(data))
+            # The web search text is not there yet, use its projected size
+            json_prompt = (
+                count_tokens(create_json_prompt("", data))
+                + prompt_tokens["websearch"] * ratios["websearch"]["output"]
+            )
+        if not os.path.exists(json_file):
+            prompt_tokens["json"] = json_prompt
+
+        input_tokens = sum(t * ratios[s]["input"] for s, t in prompt_tokens.items())
+        output_tokens = sum(t * ratios[s]["output"] for s, t in prompt_tokens.items())
+        seconds = sum(
+            t * ratios[s]["output"] * ratios[s]["seconds_per_output_token"]
+            for s, t in prompt_tokens.items()
+        )
+
+        rows.append({
+            "BVD_ID": bvd_id,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost": (input_tokens / 1_000_000) * PRICING[MODEL]["input"]
+                    + (output_tokens / 1_000_000) * PRICING[MODEL]["output"],
+            "seconds": seconds,
+            # Years with Orbis ownership data to check the LLM against
+            "value": int(data.loc[data["parent_company_name_orbis"].notna(), "year"].nunique()),
+        })
+
+    return pd.DataFrame(rows, columns=["BVD_ID", "input_tokens", "output_tokens", "cost", "seconds", "value"])
+
+def order_estimates(estimates, order="cheapest", budget=None):
+    """
+    Args:
+        order (str): "cheapest" (lowest cost first) or "value" (most Orbis
+            ownership years per dollar first).
+        budget (float): Keep only the companies that fit in the budget ($).
+    """
+    if order == "cheapest":
+        df = estimates.sort_values("cost", kind="stable")
+    elif order == "value":
+        df = estimates.assign(_value_per_cost=estimates["value"] / estimates["cost"].clip(lower=1e-9))
+        df = df.sort_values("_value_per_cost", ascending=False, kind="stable").drop(columns="_value_per_cost")
+    else:
+        raise ValueError(f"Unknown order '{order}'. Choose from: ['cheapest', 'value']")
+
+    if budget is not None:
+        df = df[df["cost"].cumsum() <= budget]
+
+    return df.reset_index(drop=True)
+
+def estimate_queue(MASTER_DATA_PATH, COMPANY_FOLDER_PATH, LLM_RESPONSES_DATA_PATH, MODEL,
+                   limit=None, order=None, budget=None):
+    companies = load_companies(MASTER_DATA_PATH)
+    ratios = compute_ratios(load_history(companies, LLM_RESPONSES_DATA_PATH, MODEL))
+
+    unprocessed = {
+        bvd_id: data for bvd_id, data in companies.items()
+        if not os.path.exists(os.path.join(COMPANY_FOLDER_PATH, f"{bvd_id}_{MODEL}_panel.csv"))
+    }
+    estimates = estimate_companies(unprocessed, ratios, LLM_RESPONSES_DATA_PATH, MODEL)
+
+    if order is not None:
+        estimates = order_estimates(estimates, order=order, budget=budget)
+    elif budget is not None:
+        estimates = estimates[estimates["cost"].cumsum() <= budget]
+    if limit is not None:
+        estimates = estimates.head(limit)
+
+    return estimates, ratios
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Dry run: projected cost and time of the unprocessed companies, without calling the API.")
+    parser.add_argument("--limit", type=int, default=None, help="Number of new BVD_IDs to estimate (excluding already processed ones).")
+    parser.add_argument("--model", type=str, default="gpt-5", help="LLM model to use (default: gpt-5)")
+    parser.add_argument("--order", type=str, default=None, choices=["cheapest", "value"], help="Order of the queue (default: master file order).")
+    parser.add_argument("--budget", type=float, default=None, help="Keep only the companies that fit in this budget ($).")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    MASTER_DATA_PATH = os.getenv("MASTER_DATA_PATH")
+    LLM_RESPONSES_DATA_PATH = os.getenv("LLM_RESPONSES_DATA_PATH")
+    COMPANY_FOLDER_PATH = os.getenv("COMPANY_FOLDER_PATH")
+
+    estimates, ratios = estimate_queue(
+        MASTER_DATA_PATH=MASTER_DATA_PATH,
+        COMPANY_FOLDER_PATH=COMPANY_FOLDER_PATH,
+        LLM_RESPONSES_DATA_PATH=LLM_RESPONSES_DATA_PATH,
+        MODEL=args.model,
+        limit=args.limit,
+        order=args.order,
+        budget=args.budget)
+
+    if tiktoken is None:
+        print("tiktoken not available, approximating 4 characters per token.")
+    for stage, ratio in ratios.items():
+        print(f"{stage}: {ratio['input']:.2f} input / {ratio['output']:.2f} output tokens per prompt token, "
+              f"{ratio['seconds_per_output_token'] * 1000:.1f} ms per output token")
+
+    print(f"Companies: {len(estimates)}")
+    print(f"Projected tokens: {estimates['input_tokens'].sum():,.0f} input, {estimates['output_tokens'].sum():,.0f} output")
+    print(f"Projected cost: ${estimates['cost'].sum():.2f}")
+    print(f"Projected time: {estimates['seconds'].sum() / 3600:.1f} hours")
@@ -8,6 +8,8 @@ import pandas as pd
 from openai import OpenAI
 from functools import wraps
 from datetime import datetime
+from compact_payload import PAYLOAD_FORMAT, encode_payload_text
+from llm_streaming import load_partial_response_text, partial_file_name, stream_llm_response
 
 def load_dotenv():
     # Ref: https://stackoverflow.com/a/78972639/
@@ -31,6 +33,11 @@ def filter_company(RAW_DATA_PATH, BVD_ID):
     df = pd.read_csv(RAW_DATA_PATH)
     df = df[df["BVD_ID"] == BVD_ID]
 
+    return format_company(df)
+
+def format_company(data):
+    df = data.copy()
+
     df.loc[:, "parent_company_ownership_years"] = (
         df["parent_company_start_year_ownership"].fillna(0).astype(int).astype(str)
         + " - " +
@@ -86,6 +93,10 @@ def print_openai_cost_from_response(MODEL, response):
 def load_llm_web_response_text(LLM_RESPONSES_DATA_PATH, BVD_ID, MODEL):
     response_web = f"{LLM_RESPONSES_DATA_PATH}/{BVD_ID}_{MODEL}_websearch.json"
 
+    # Web search text kept after a stall, final response not saved
+    if not os.path.exists(response_web) and os.path.exists(partial_file_name(response_web)):
+        return load_partial_response_text(partial_file_name(response_web), text_kept_only=True)
+
     with open(response_web, "r", encoding="utf-8") as f:
         raw_json = f.read()
 
@@ -101,14 +112,16 @@ def load_llm_web_response_text(LLM_RESPONSES_DATA_PATH, BVD_ID, MODEL):
     raise ValueError("Could not find response text in expected format")
 
 
-@timeit
-def create_json_llm_response(llm_text, data, CHATGPT_KEY, MODEL, print_cost=False):
-    json_sample = data.to_json()
+def create_json_prompt(llm_text, data):
+    json_sample = encode_payload_text(data)
 
     prompt = f"""
         You are given:
         1. The company data: {llm_text}
-        2. A pandas DataFrame in JSON format: {json_sample}
+        2. A pandas DataFrame by year in compact JSON format: {json_sample}
+
+        Compact JSON format:
+        {PAYLOAD_FORMAT}
 
         Task:
         - Insert the information from the string into the DataFrame.
@@ -120,24 +133,44 @@ def create_json_llm_response(llm_text, data, CHATGPT_KEY, MODEL, print_cost=Fals
 
         Formatting rules:
         - If multiple values exist for the following fields use list notation: parent_company_name_orbis, parent_company_country, GUO, GUO_country, 'parent_company_ownership_years'. Examples: ["Parent Company 1", "Parent Company 2"], [India, USA], [1992-2021, 1995-2010].
+        - The values at the same position of the lists of a year belong to the same parent company.
         - 'company_name', 'company_international_name', and 'parent_company_name' company and parent company naming of the output have to match the naming of the pandas DataFrame in JSON format.
-        - Output a valid and readable JSON — not code.
+        - Output a valid and readable JSON in the same compact JSON format — not code.
 
 
         Output:
-        - Only the final JSON with the updated columns and years, from 1995 to 2015.
+        - Only the final compact JSON with the updated columns and years, from 1995 to 2015.
         - No comment, output should be a readable JSON file.
         """
 
-    client = OpenAI(api_key=CHATGPT_KEY)
+    return prompt
 
-    response = client.responses.create(
-        model=MODEL,
-        tools=[{"type": "code_interpreter","container": {"type": "auto"}}],
-        input=[{"role": "user", "content": prompt}]
-    )
+@timeit
+def create_json_llm_response(llm_text, data, CHATGPT_KEY, MODEL, print_cost=False,
+                             PARTIAL_FILE_PATH=None, idle_timeout=120, client=None):
+
+    prompt = create_json_prompt(llm_text, data)
+
+    if client is None:
+        client = OpenAI(api_key=CHATGPT_KEY)
+
+    if PARTIAL_FILE_PATH is None:
+        response = client.responses.create(
+            model=MODEL,
+            tools=[{"type": "code_interpreter","container": {"type": "auto"}}],
+            input=[{"role": "user", "content": prompt}]
+        )
+    else:
+        response = stream_llm_response(
+            client,
+            PARTIAL_FILE_PATH=PARTIAL_FILE_PATH,
+            idle_timeout=idle_timeout,
+            model=MODEL,
+            tools=[{"type": "code_interpreter","container": {"type": "auto"}}],
+            input=[{"role": "user", "content": prompt}]
+        )
 
-    if print_cost:
+    if print_cost and response.usage is not None:
         print_openai_cost_from_response(MODEL, response)
 
 
@@ -148,6 +181,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="LLM company call.")
     parser.add_argument("--bvd_id", type=str, required=True, help="Bureau van Dijk company ID")
     parser.add_argument("--model", type=str, default="gpt-5", help="LLM model to use (default: gpt-5)")
+    parser.add_argument("--idle_timeout", type=int, default=120, help="Seconds without streamed events before retrying the call (default: 120)")
     args = parser.parse_args()
 
     BVD_ID = args.bvd_id
@@ -182,7 +216,9 @@ if __name__ == "__main__":
             data=df_company,
             CHATGPT_KEY=os.getenv("CHATGPT_KEY"),
             MODEL=MODEL,
-            print_cost=True
+            print_cost=True,
+            PARTIAL_FILE_PATH=partial_file_name(file_name),
+            idle_timeout=args.idle_timeout
         )
 
         # Save response
@@ -192,5 +228,6 @@ if __name__ == "__main__":
                 "timestamp": datetime.now().isoformat(),
                 "response": response_json.model_dump()
             }, f, ensure_ascii=False, indent=2)
+        os.remove(partial_file_name(file_name))
 
     print(f"✓ llm_code_interpreter_call.py completed successfully")
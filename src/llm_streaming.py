@@ -0,0 +1,111 @@
+import os
+import json
+from datetime import datetime
+from httpx import TimeoutException
+from openai import APITimeoutError
+
+# Written to the partial file when a stalled stream keeps its output text
+TEXT_KEPT_EVENT = "stream.text_kept"
+
+def partial_file_name(file_name):
+    # e.g. IN31739FI_gpt-5_websearch.json -> IN31739FI_gpt-5_websearch.partial.jsonl
+    return os.path.splitext(file_name)[0] + ".partial.jsonl"
+
+def stream_llm_response(client, PARTIAL_FILE_PATH, idle_timeout=120, max_retries=2, **kwargs):
+    """
+    `client.responses.create` with stream=True. Every event is appended to
+    PARTIAL_FILE_PATH as it arrives. A stream without events for
+    `idle_timeout` seconds is cancelled and retried up to `max_retries` times.
+
+    Returns:
+        The final response. If the stream stalls after the output text is
+        done, the response is returned without waiting for the trailing
+        metadata (`usage` is None).
+    """
+    streaming_client = client.with_options(timeout=idle_timeout)
+
+    for attempt in range(max_retries + 1):
+        response = None
+        output = {}
+        text_done = False
+
+        stream = None
+        try:
+            stream = streaming_client.responses.create(stream=True, **kwargs)
+            with open(PARTIAL_FILE_PATH, "a", encoding="utf-8") as f:
+                for event in stream:
+                    f.write(json.dumps({
+                        "timestamp": datetime.now().isoformat(),
+                        "attempt": attempt,
+                        "event": event.model_dump()
+                    }, ensure_ascii=False) + "\n")
+                    f.flush()
+
+                    if event.type in ("response.created", "response.in_progress"):
+                        response = event.response
+                    elif event.type == "response.output_item.done":
+                        output[event.output_index] = event.item
+                        # The text is kept only once its message item is complete
+                        if event.item.type == "message":
+                            text_done = True
+                    elif event.type == "response.completed":
+                        return event.response
+                    elif event.type in ("response.failed", "response.incomplete", "error"):
+                        raise ValueError(f"LLM response stream ended with '{event.type}'")
+
+        except (APITimeoutError, TimeoutException):
+            if text_done and response is not None:
+                print(f"✗ No trailing metadata after {idle_timeout}s, keeping the response text.")
+                with open(PARTIAL_FILE_PATH, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({
+                        "timestamp": datetime.now().isoformat(),
+                        "attempt": attempt,
+                        "event": {"type": TEXT_KEPT_EVENT}
+                    }) + "\n")
+                return response.model_copy(update={
+                    "output": [output[i] for i in sorted(output)],
+                    "usage": None,
+                })
+            print(f"✗ Stream stalled for {idle_timeout}s (attempt {attempt + 1}/{max_retries + 1}).")
+        finally:
+            # Cancels the request if the stream did not end
+            if stream is not None:
+                stream.close()
+
+    raise TimeoutError(f"LLM response stream stalled {max_retries + 1} times")
+
+def load_partial_response_text(PARTIAL_FILE_PATH, text_kept_only=False):
+    """
+    Output text of the last attempt of a streamed response, available as soon
+    as its text is done, before the final response file is written.
+
+    Args:
+        text_kept_only (bool): Only return the text of an attempt that
+            stalled after its text was done (see `stream_llm_response`).
+
+    Raises:
+        ValueError: No text, or the attempt ended failed or incomplete.
+    """
+    text = None
+    failed = text_kept = False
+    with open(PARTIAL_FILE_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)["event"]
+            if event["type"] == "response.created":
+                text = None
+                failed = text_kept = False
+            elif event["type"] == "response.output_text.done":
+                text = event["text"]
+            elif event["type"] in ("response.failed", "response.incomplete", "error"):
+                failed = True
+            elif event["type"] == TEXT_KEPT_EVENT:
+                text_kept = True
+
+    if text is None:
+        raise ValueError(f"No output text in {PARTIAL_FILE_PATH}")
+    if failed:
+        raise ValueError(f"Streamed response failed or incomplete in {PARTIAL_FILE_PATH}")
+    if text_kept_only and not text_kept:
+        raise ValueError(f"Streamed response in {PARTIAL_FILE_PATH} did not stall after its text")
+
+    return text
@@ -8,6 +8,7 @@ import pandas as pd
 from openai import OpenAI
 from functools import wraps
 from datetime import datetime
+from llm_streaming import partial_file_name, stream_llm_response
 
 def load_dotenv():
     # Ref: https://stackoverflow.com/a/78972639/
@@ -31,6 +32,11 @@ def filter_company(RAW_DATA_PATH, BVD_ID):
     df = pd.read_csv(RAW_DATA_PATH)
     df = df[df["BVD_ID"] == BVD_ID]
 
+    return format_company(df)
+
+def format_company(data):
+    df = data.copy()
+
     df.loc[:, "parent_company_ownership_years"] = (
         df["parent_company_start_year_ownership"].fillna(0).astype(int).astype(str)
         + " - " +
@@ -82,12 +88,10 @@ def print_openai_cost_from_response(MODEL, response):
 
     return print(f"API call estimated cost: ${cost:.2f}")
 
-@timeit
-def create_websearch_llm_response(data, CHATGPT_KEY, MODEL, print_cost=False):
+def create_websearch_prompt(data):
 
     company = data.company_name.unique()[0]
     international_name = data.company_international_name.unique()[0]
-    json_sample = data.to_json()
 
     prompt = f"""
         Research in the web the history of ownership of the indian company "{company}", internationally known as "{international_name}"
@@ -112,15 +116,34 @@ def create_websearch_llm_response(data, CHATGPT_KEY, MODEL, print_cost=False):
 
         """
 
-    client = OpenAI(api_key=CHATGPT_KEY)
+    return prompt
 
-    response = client.responses.create(
-        model=MODEL,
-        tools=[{"type": "web_search"}],
-        input=prompt
-    )
+@timeit
+def create_websearch_llm_response(data, CHATGPT_KEY, MODEL, print_cost=False,
+                                  PARTIAL_FILE_PATH=None, idle_timeout=120, client=None):
+
+    prompt = create_websearch_prompt(data)
+
+    if client is None:
+        client = OpenAI(api_key=CHATGPT_KEY)
+
+    if PARTIAL_FILE_PATH is None:
+        response = client.responses.create(
+            model=MODEL,
+            tools=[{"type": "web_search"}],
+            input=prompt
+        )
+    else:
+        response = stream_llm_response(
+            client,
+            PARTIAL_FILE_PATH=PARTIAL_FILE_PATH,
+            idle_timeout=idle_timeout,
+            model=MODEL,
+            tools=[{"type": "web_search"}],
+            input=prompt
+        )
 
-    if print_cost:
+    if print_cost and response.usage is not None:
         print_openai_cost_from_response(MODEL, response)
 
     return response
@@ -130,14 +153,15 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="LLM company web search call.")
     parser.add_argument("--bvd_id", type=str, required=True, help="Bureau van Dijk company ID")
     parser.add_argument("--model", type=str, default="gpt-5", help="LLM model to use (default: gpt-5)")
+    parser.add_argument("--idle_timeout", type=int, default=120, help="Seconds without streamed events before retrying the call (default: 120)")
     args = parser.parse_args()
 
     BVD_ID = args.bvd_id
     MODEL = args.model
 
     load_dotenv()
-    MASTER_DATA_PATH =  ${MASTER_DATA_PATH}
-    LLM_RESPONSES_DATA_PATH =  ${LLM_RESPONSES_DATA_PATH}
+    MASTER_DATA_PATH = os.getenv("MASTER_DATA_PATH")
+    LLM_RESPONSES_DATA_PATH = os.getenv("LLM_RESPONSES_DATA_PATH")
 
 
     # Check if LLM response already exists
@@ -156,7 +180,9 @@ if __name__ == "__main__":
             data=df_company,
             CHATGPT_KEY=os.getenv("CHATGPT_KEY"),
             MODEL=MODEL,
-            print_cost=True
+            print_cost=True,
+            PARTIAL_FILE_PATH=partial_file_name(file_name),
+            idle_timeout=args.idle_timeout
         )
         # Save response
         with open(file_name, "w", encoding="utf-8") as f:
@@ -164,5 +190,6 @@ if __name__ == "__main__":
                 "timestamp": datetime.now().isoformat(),
                 "response": response_web.model_dump()
             }, f, ensure_ascii=False, indent=2)
+        os.remove(partial_file_name(file_name))
 
         print(f"✓ llm_web_search_call.py completed successfully")
@@ -1,19 +1,92 @@
 import os
+import json
 import dotenv
 import argparse
 import subprocess
 import pandas as pd
 from tqdm import tqdm
+from estimate_cost import estimate_queue
+from llm_streaming import load_partial_response_text, partial_file_name
 
 def load_dotenv():
     # Ref: https://stackoverflow.com/a/78972639/
     dotenv.load_dotenv()
     dotenv.load_dotenv(dotenv.find_dotenv(usecwd=True))
 
+def load_fingerprints(MASTER_DATA_PATH):
+    # Written by merge_raw_data.py
+    fingerprints_path = os.path.splitext(MASTER_DATA_PATH)[0] + "_fingerprints.csv"
+    if not os.path.exists(fingerprints_path):
+        return {}
+
+    return pd.read_csv(fingerprints_path).set_index("BVD_ID")["fingerprint"].to_dict()
+
+def load_processed_fingerprints(LLM_RESPONSES_DATA_PATH, MODEL):
+    file_name = os.path.join(LLM_RESPONSES_DATA_PATH, f"{MODEL}_fingerprints.json")
+    if not os.path.exists(file_name):
+        return {}
+
+    with open(file_name, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_processed_fingerprints(LLM_RESPONSES_DATA_PATH, MODEL, processed_fingerprints):
+    file_name = os.path.join(LLM_RESPONSES_DATA_PATH, f"{MODEL}_fingerprints.json")
+    with open(file_name, "w", encoding="utf-8") as f:
+        json.dump(processed_fingerprints, f, indent=2, sort_keys=True)
+
+def invalidate_changed_companies(ids, fingerprints, processed_fingerprints,
+                                 COMPANY_FOLDER_PATH, LLM_RESPONSES_DATA_PATH, MODEL):
+    """
+    Deletes the LLM responses and panel of the companies whose Orbis inputs
+    changed since their first response was written, so the loop researches
+    them again.
+    """
+    invalidated = []
+    for bvd_id in ids:
+        current = fingerprints.get(bvd_id)
+        if current is None:
+            continue
+        company_file_name = os.path.join(COMPANY_FOLDER_PATH, f"{bvd_id}_{MODEL}_panel.csv")
+        response_file_names = [
+            os.path.join(LLM_RESPONSES_DATA_PATH, f"{bvd_id}_{MODEL}_{stage}.json")
+            for stage in ["websearch", "json"]
+        ]
+        response_file_names += [partial_file_name(file_name) for file_name in response_file_names]
+
+        if bvd_id not in processed_fingerprints:
+            # Processed before fingerprints existed, assume up to date
+            if os.path.exists(company_file_name):
+                processed_fingerprints[bvd_id] = current
+                continue
+            # Responses of an unfinished company, their Orbis inputs are unknown
+            if not any(os.path.exists(file_name) for file_name in response_file_names):
+                continue
+        elif processed_fingerprints[bvd_id] == current:
+            continue
+
+        for file_name in response_file_names + [company_file_name]:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        processed_fingerprints.pop(bvd_id, None)
+        invalidated.append(bvd_id)
+
+    return invalidated
+
 def process_company(MASTER_DATA_PATH, COMPANY_FOLDER_PATH,LLM_RESPONSES_DATA_PATH, MODEL):
 
     ids = pd.read_csv(MASTER_DATA_PATH).BVD_ID.dropna().unique()
 
+    # Re-research only the companies with changed Orbis inputs
+    fingerprints = load_fingerprints(MASTER_DATA_PATH)
+    processed_fingerprints = load_processed_fingerprints(LLM_RESPONSES_DATA_PATH, MODEL)
+    invalidated = invalidate_changed_companies(
+        ids, fingerprints, processed_fingerprints,
+        COMPANY_FOLDER_PATH, LLM_RESPONSES_DATA_PATH, MODEL)
+    save_processed_fingerprints(LLM_RESPONSES_DATA_PATH, MODEL, processed_fingerprints)
+
+    if invalidated:
+        print(f"Invalidated {len(invalidated)} companies with changed Orbis inputs: {', '.join(invalidated)}")
+
     processed = [
         bvd_id for bvd_id in ids
         if os.path.exists(os.path.join(COMPANY_FOLDER_PATH, f"{bvd_id}_{MODEL}_panel.csv"))
@@ -22,6 +95,18 @@ def process_company(MASTER_DATA_PATH, COMPANY_FOLDER_PATH,LLM_RESPONSES_DATA_PAT
 
     print(f"Already processed: {len(processed)}/{len(ids)} companies")
 
+    # Reorder unprocessed companies by projected cost
+    if args.order is not None or args.budget is not None:
+        estimates, _ = estimate_queue(
+            MASTER_DATA_PATH=MASTER_DATA_PATH,
+            COMPANY_FOLDER_PATH=COMPANY_FOLDER_PATH,
+            LLM_RESPONSES_DATA_PATH=LLM_RESPONSES_DATA_PATH,
+            MODEL=MODEL,
+            order=args.order,
+            budget=args.budget)
+        unprocessed = estimates.BVD_ID.tolist()
+        print(f"Queue ordered by {args.order or 'master file'}: {len(unprocessed)} companies, projected cost ${estimates.cost.sum():.2f}")
+
     # Apply limit to unprocessed companies
     if args.limit is not None:
         unprocessed = unprocessed[:args.limit]
@@ -54,8 +139,18 @@ def process_company(MASTER_DATA_PATH, COMPANY_FOLDER_PATH,LLM_RESPONSES_DATA_PAT
                     text=True
                 )
             except subprocess.CalledProcessError as e:
-                print("✗ Error running llm_web_search_call.py: {e.stderr}")
-                continue
+                print(f"✗ Error running llm_web_search_call.py: {e.stderr}")
+                # The text of a stream that stalled after it is enough for the next stage
+                try:
+                    load_partial_response_text(partial_file_name(file_name), text_kept_only=True)
+                except (OSError, ValueError):
+                    continue
+                print("✓ Websearch LLM response text streamed, continuing.")
+
+        # Orbis inputs the responses are built from
+        if bvd_id in fingerprints and bvd_id not in processed_fingerprints:
+            processed_fingerprints[bvd_id] = fingerprints[bvd_id]
+            save_processed_fingerprints(LLM_RESPONSES_DATA_PATH, MODEL, processed_fingerprints)
 
         # Check if json LLM response already exists
         file_name = os.path.join(LLM_RESPONSES_DATA_PATH, f"{bvd_id}_{MODEL}_json.json")
@@ -73,6 +168,16 @@ def process_company(MASTER_DATA_PATH, COMPANY_FOLDER_PATH,LLM_RESPONSES_DATA_PAT
                 print(f"✗ Error running llm_code_interpreter_call.py: {e.stderr}")
                 continue
 
+        # Fill missing years/fields of the JSON LLM response
+        try:
+            subprocess.run(
+                ["python", "src/validate_llm_json.py", "--bvd_id", str(bvd_id), "--repair"],
+                check=True,
+                text=True
+            )
+        except subprocess.CalledProcessError as e:
+            print(f"✗ Error running validate_llm_json.py: {e.stderr}")
+
         # Format LLM output
         if os.path.exists(company_file_name):
             print("✓ Formatted output .csv file already exists.")
@@ -104,6 +209,8 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Process companies with optional limit on number of new BVD_IDs.")
     parser.add_argument("--limit", type=int, default=None, help="Number of new BVD_IDs to process (excluding already processed ones).")
+    parser.add_argument("--order", type=str, default=None, choices=["cheapest", "value"], help="Order new BVD_IDs by projected cost (see estimate_cost.py).")
+    parser.add_argument("--budget", type=float, default=None, help="Only process the new BVD_IDs that fit in this budget ($).")
     args = parser.parse_args()
 
     process_company(
@@ -1,5 +1,6 @@
 import os
 import dotenv
+import hashlib
 import pandas as pd
 
 def load_dotenv():
@@ -69,6 +70,40 @@ def create_raw_master_file(
 
     return df
 
+FINGERPRINT_COLUMNS = [
+    "year", "company_name", "company_international_name", "parent_company_name_orbis",
+    "parent_company_start_year_ownership", "parent_company_end_year_ownership"]
+
+def create_fingerprints(data, FINGERPRINTS_PATH):
+    """
+    Content fingerprint per BVD_ID of the raw master rows that feed
+    `filter_company`. A firm needs to be re-researched only if its
+    fingerprint changed between two raw data deliveries.
+    """
+    # Only the columns kept by format_company end up in the prompts
+    row_hashes = pd.util.hash_pandas_object(data[FINGERPRINT_COLUMNS], index=False)
+
+    # Sorted row hashes, so the order of the rows does not matter
+    fingerprints = (
+        row_hashes
+        .groupby(data["BVD_ID"], sort=True)
+        .apply(lambda h: hashlib.sha256(h.sort_values().to_numpy().tobytes()).hexdigest())
+        .rename("fingerprint")
+        .reset_index()
+    )
+
+    # Report firms whose Orbis inputs changed since the last merge
+    if os.path.exists(FINGERPRINTS_PATH):
+        previous = pd.read_csv(FINGERPRINTS_PATH).set_index("BVD_ID")["fingerprint"]
+        current = fingerprints.set_index("BVD_ID")["fingerprint"]
+        common = current.index.intersection(previous.index)
+        changed = common[current[common] != previous[common]]
+        print(f"Changed Orbis inputs: {len(changed)} companies, new: {len(current.index.difference(previous.index))}")
+
+    fingerprints.to_csv(FINGERPRINTS_PATH, index=False)
+
+    return fingerprints
+
 if __name__=="__main__":
 
     load_dotenv()
@@ -76,10 +111,16 @@ if __name__=="__main__":
     MASTER_DATA_PATH = os.getenv("MASTER_DATA_PATH")
     RAW_DATA_PATH = os.getenv("RAW_DATA_PATH")
 
-    create_raw_master_file(
+    df = create_raw_master_file(
         RAW_DATA_PATH = RAW_DATA_PATH,
         FIRMS_STATA_FILENAME = "ALL_BvDID_all_firms_update.dta",
         ORBIS_STATA_FILENAME = "PANEL_controlling_firms_orbis.dta",
         MASTER_DATA_PATH = MASTER_DATA_PATH
     )
     print("Raw master file created successfully.")
+
+    create_fingerprints(
+        data = df,
+        FINGERPRINTS_PATH = os.path.splitext(MASTER_DATA_PATH)[0] + "_fingerprints.csv"
+    )
+    print("Fingerprints file created successfully.")
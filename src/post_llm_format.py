@@ -5,6 +5,10 @@ import argparse
 import pandas as pd
 import numpy as np
 from io import StringIO
+from compact_payload import decode_payload, is_compact_payload
+
+# Placeholders the LLM writes for empty values, also used by validate_llm_json.py
+NAN_VALUES = ["", "None", None, "NA (independent)", "NA", "N/A", "N/A (not yet incorporated)", "[]", "<NA>", "Not applicable (standalone)"]
 
 def load_dotenv():
     # Ref: https://stackoverflow.com/a/78972639/
@@ -29,6 +33,11 @@ def load_llm_json_response_text(LLM_RESPONSES_DATA_PATH,
     json_parsed = json.loads(raw_json)
     response_text = json_parsed['response']['output'][1]['content'][0]['text']
 
+    # Compact payload, or the full DataFrame JSON of older responses
+    response_parsed = json.loads(response_text)
+    if is_compact_payload(response_parsed):
+        return decode_payload(response_parsed)
+
     return pd.read_json(StringIO(response_text))
 
 def create_bvd_id_map_dicts(RAW_OWNERSHIP_DATA_PATH):
@@ -115,7 +124,7 @@ def map_ids(data, company_id_map, BVD_ID, COMPANY_ORBIS_NAME):
 
     return df
 
-def create_guo_india_columns(data):
+def create_guo_india_columns(data, company_id_map):
     df = data.copy()
 
     guo_india_map = df[df["GUO_country"] == "India"].set_index("year").to_dict()["GUO"]
@@ -146,8 +155,7 @@ def clean_nans(data):
     df.loc[mask, cols_to_nan] = np.nan
 
     # Format NaNs
-    nan_values = ["", "None", None, "NA (independent)", "NA", "N/A", "N/A (not yet incorporated)", "[]", "<NA>", "Not applicable (standalone)"]
-    df = df.where(~df.isin(nan_values), np.nan)
+    df = df.where(~df.isin(NAN_VALUES), np.nan)
 
     return df
 
@@ -197,7 +205,7 @@ if __name__ == "__main__":
             company_id_map=company_id_map,
             BVD_ID=BVD_ID,
             COMPANY_ORBIS_NAME=company_orbis_name)
-        .pipe(create_guo_india_columns)
+        .pipe(create_guo_india_columns, company_id_map=company_id_map)
         .pipe(order_columns)
         .pipe(clean_nans)
         .pipe(clean_formats)
@@ -0,0 +1,309 @@
+import os
+import time
+import json
+import dotenv
+import argparse
+import pandas as pd
+from openai import OpenAI
+from functools import wraps
+from datetime import datetime
+from compact_payload import PAYLOAD_FORMAT, decode_payload_text, encode_payload_text
+from llm_code_interpreter_call import load_llm_web_response_text
+from post_llm_format import NAN_VALUES, load_llm_json_response_text
+
+YEARS = list(range(1995, 2016))
+
+REQUIRED_COLUMNS = [
+    'year', 'company_name', 'company_international_name', 'establishment_year',
+    'parent_company_name_orbis', 'parent_company_country', 'JV', 'GUO',
+    'GUO_country', 'parent_company_ownership_years', 'sources']
+
+# Columns that have to be set every year, also for independent firms
+ALWAYS_SET_COLUMNS = ['company_name', 'establishment_year', 'JV', 'sources']
+
+# If the key column is set for a year, the value columns have to be set too
+DEPENDENT_COLUMNS = {
+    "parent_company_name_orbis": ["parent_company_country", "parent_company_ownership_years"],
+    "GUO": ["GUO_country"],
+}
+
+def load_dotenv():
+    # Ref: https://stackoverflow.com/a/78972639/
+    dotenv.load_dotenv()
+    dotenv.load_dotenv(dotenv.find_dotenv(usecwd=True))
+
+def timeit(func):
+    @wraps(func)
+    def timeit_wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        end_time = time.perf_counter()
+        total_time = end_time - start_time
+        print(f"Function {func.__name__} took {total_time:.1f} seconds")
+        return result
+    return timeit_wrapper
+
+def print_openai_cost_from_response(MODEL, response):
+    """
+    Args:
+        model (str): One of "gpt-5", "gpt-5-mini", "gpt-5-nano".
+        response: The API response object (must include response.usage).
+
+    """
+
+    # Pricing per 1M tokens
+    pricing = {
+        "gpt-5": {"input": 1.250, "cached": 0.125, "output": 10.000},
+        "gpt-5-mini": {"input": 0.250, "cached": 0.025, "output": 2.000},
+        "gpt-5-nano": {"input": 0.050, "cached": 0.005, "output": 0.400},
+    }
+
+    if MODEL not in pricing:
+        raise ValueError(f"Unknown model '{MODEL}'. Choose from: {list(pricing.keys())}")
+
+    # Extract token usage from the response
+    usage = response.usage
+    input_tokens = getattr(usage, "input_tokens", 0)
+    cached_tokens = getattr(usage, "cached_tokens", 0)
+    output_tokens = getattr(usage, "output_tokens", 0)
+
+    # Compute cost
+    cost = (
+        (input_tokens / 1_000_000) * pricing[MODEL]["input"] +
+        (cached_tokens / 1_000_000) * pricing[MODEL]["cached"] +
+        (output_tokens / 1_000_000) * pricing[MODEL]["output"]
+    )
+
+    return print(f"API call estimated cost: ${cost:.2f}")
+
+def is_missing(x):
+    # Lists are missing only when empty or made of missing values
+    if isinstance(x, list):
+        return all(is_missing(v) for v in x)
+    if x is None or (isinstance(x, str) and x.strip() in NAN_VALUES):
+        return True
+    return bool(pd.isna(x))
+
+def validate_json_response(data):
+    """
+    Finds the gaps of a code_interpreter response (output of
+    `load_llm_json_response_text`).
+
+    Returns:
+        dict: {"missing_years": [...], "missing_columns": [...],
+               "missing_fields": {column: [years]}}. Empty lists/dicts if
+               the panel is complete.
+    """
+    df = data.copy()
+
+    missing_columns = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if "year" in missing_columns:
+        return {"missing_years": YEARS, "missing_columns": missing_columns, "missing_fields": {}}
+
+    df["year"] = pd.to_numeric(df["year"], errors="coerce")
+    missing_years = [y for y in YEARS if y not in set(df["year"].dropna().astype(int))]
+
+    df = df[df["year"].isin(YEARS)]
+    missing = df.drop(columns="year").map(is_missing)
+    missing["year"] = df["year"].astype(int)
+
+    missing_fields = {}
+
+    # Columns that came back empty for every year. Ownership columns can be
+    # empty for independent firms
+    for col in ALWAYS_SET_COLUMNS:
+        if col in df.columns and missing[col].all():
+            missing_fields[col] = sorted(missing["year"].unique().tolist())
+
+    # Value columns left empty while their key column is set
+    for key_col, value_cols in DEPENDENT_COLUMNS.items():
+        if key_col not in df.columns:
+            continue
+        for col in value_cols:
+            if col not in df.columns or col in missing_fields:
+                continue
+            years = sorted(missing.loc[~missing[key_col] & missing[col], "year"].unique().tolist())
+            if years:
+                missing_fields[col] = years
+
+    return {
+        "missing_years": missing_years,
+        "missing_columns": missing_columns,
+        "missing_fields": missing_fields,
+    }
+
+def has_gaps(gaps):
+    return bool(gaps["missing_years"] or gaps["missing_columns"] or gaps["missing_fields"])
+
+def print_gaps(gaps):
+    if gaps["missing_years"]:
+        print(f"  Missing years: {gaps['missing_years']}")
+    if gaps["missing_columns"]:
+        print(f"  Missing columns: {gaps['missing_columns']}")
+    for col, years in gaps["missing_fields"].items():
+        print(f"  Empty '{col}' for years: {years}")
+
+@timeit
+def create_repair_llm_response(llm_text, data, gaps, CHATGPT_KEY, MODEL, print_cost=False, client=None):
+    """
+    Follow-up call that only asks for the gaps found by
+    `validate_json_response`, instead of re-running both stages.
+    """
+    requested = []
+    if gaps["missing_years"]:
+        requested.append(f"- All the columns for the years: {gaps['missing_years']}.")
+    if gaps["missing_columns"]:
+        requested.append(f"- The columns {gaps['missing_columns']} for every year from 1995 to 2015.")
+    for col, years in gaps["missing_fields"].items():
+        requested.append(f"- The column '{col}' for the years: {years}.")
+    requested = "\n        ".join(requested)
+
+    known_rows = encode_payload_text(data)
+
+    prompt = f"""
+        You are given:
+        1. The company data: {llm_text}
+        2. The panel already extracted from it, in compact JSON format: {known_rows}
+
+        Compact JSON format:
+        {PAYLOAD_FORMAT}
+
+        Task:
+        The panel is incomplete. Using only the company data, return:
+        {requested}
+
+        Formatting rules:
+        - Same column names and value formats as the panel already extracted.
+        - If multiple values exist for the following fields use list notation: parent_company_name_orbis, parent_company_country, GUO, GUO_country, 'parent_company_ownership_years'. Examples: ["Parent Company 1", "Parent Company 2"], [India, USA], [1992-2021, 1995-2010].
+        - The lists of a year follow the order of 'parent_company_name_orbis' in the panel already extracted.
+
+        Output:
+        - Only a valid JSON in the compact JSON format, with the requested years and columns.
+        - No comment, output should be a readable JSON file.
+        """
+
+    if client is None:
+        client = OpenAI(api_key=CHATGPT_KEY)
+
+    response = client.responses.create(
+        model=MODEL,
+        input=[{"role": "user", "content": prompt}]
+    )
+
+    if print_cost:
+        print_openai_cost_from_response(MODEL, response)
+
+    return response
+
+def merge_repair(data, repair):
+    # The stored panel wins, the repair only fills its gaps
+    data = data.set_index("year")
+    repair = repair.set_index("year")
+    # Missing values such as "" or "N/A" as NaN, so combine_first fills them
+    data = data.mask(data.map(is_missing))
+    repair = repair.mask(repair.map(is_missing))
+
+    df = (
+        data
+        .combine_first(repair)
+        .reset_index()
+        .sort_values("year")
+    )
+    df = df[[c for c in REQUIRED_COLUMNS if c in df.columns]
+            + [c for c in df.columns if c not in REQUIRED_COLUMNS]]
+
+    return df
+
+def apply_repair(data, response_repair):
+    # An answer that cannot be read leaves the panel as it was
+    try:
+        repair = decode_payload_text(response_repair.output_text)
+    except ValueError as e:
+        print(f"✗ Could not read the repair answer: {e}")
+        return data
+
+    # Several values of a year come as lists, a repeated year is a duplicate span
+    return merge_repair(data, repair.drop_duplicates(subset="year"))
+
+def is_repaired(LLM_RESPONSES_DATA_PATH, BVD_ID, MODEL):
+    # Only one repair call per response, gaps left after it are kept
+    file_name = f"{LLM_RESPONSES_DATA_PATH}/{BVD_ID}_{MODEL}_json.json"
+
+    with open(file_name, "r", encoding="utf-8") as f:
+        return bool(json.load(f).get("repairs"))
+
+def save_repaired_json_response(LLM_RESPONSES_DATA_PATH, BVD_ID, MODEL, data, response_repair):
+    file_name = f"{LLM_RESPONSES_DATA_PATH}/{BVD_ID}_{MODEL}_json.json"
+
+    with open(file_name, "r", encoding="utf-8") as f:
+        json_parsed = json.load(f)
+
+    # Replace the text read by load_llm_json_response_text, keep the call log
+    json_parsed['response']['output'][1]['content'][0]['text'] = encode_payload_text(data)
+    json_parsed.setdefault("repairs", []).append({
+        "timestamp": datetime.now().isoformat(),
+        "response": response_repair.model_dump()
+    })
+
+    with open(file_name, "w", encoding="utf-8") as f:
+        json.dump(json_parsed, f, ensure_ascii=False, indent=2)
+
+    return file_name
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Validate the JSON LLM response and repair its gaps.")
+    parser.add_argument("--bvd_id", type=str, required=True, help="Bureau van Dijk company ID")
+    parser.add_argument("--model", type=str, default="gpt-5", help="LLM model to use (default: gpt-5)")
+    parser.add_argument("--repair", action="store_true", help="Request the missing years/fields to the LLM and merge them into the stored response.")
+    args = parser.parse_args()
+
+    BVD_ID = args.bvd_id
+    MODEL = args.model
+
+    load_dotenv()
+
+    LLM_RESPONSES_DATA_PATH = os.getenv("LLM_RESPONSES_DATA_PATH")
+
+    data = load_llm_json_response_text(
+        LLM_RESPONSES_DATA_PATH=LLM_RESPONSES_DATA_PATH,
+        BVD_ID=BVD_ID,
+        MODEL=MODEL)
+    gaps = validate_json_response(data)
+
+    if not has_gaps(gaps):
+        print("✓ JSON LLM response is complete.")
+    else:
+        print("✗ JSON LLM response has gaps:")
+        print_gaps(gaps)
+
+        if args.repair and is_repaired(LLM_RESPONSES_DATA_PATH, BVD_ID, MODEL):
+            print("✓ Repair already attempted. Skipping.")
+        elif args.repair:
+            llm_text = load_llm_web_response_text(
+                LLM_RESPONSES_DATA_PATH=LLM_RESPONSES_DATA_PATH,
+                BVD_ID=BVD_ID,
+                MODEL=MODEL)
+
+            response_repair = create_repair_llm_response(
+                llm_text=llm_text,
+                data=data,
+                gaps=gaps,
+                CHATGPT_KEY=os.getenv("CHATGPT_KEY"),
+                MODEL=MODEL,
+                print_cost=True
+            )
+            data = apply_repair(data, response_repair)
+
+            file_name = save_repaired_json_response(
+                LLM_RESPONSES_DATA_PATH=LLM_RESPONSES_DATA_PATH,
+                BVD_ID=BVD_ID,
+                MODEL=MODEL,
+                data=data,
+                response_repair=response_repair)
+
+            remaining = validate_json_response(data)
+            if has_gaps(remaining):
+                print("✗ Gaps left after repair:")
+                print_gaps(remaining)
+            print(f"✓ Repaired JSON LLM response saved: {file_name}")